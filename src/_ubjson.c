@@ -22,8 +22,8 @@
 
 /******************************************************************************/
 
-// container_count, sort_keys, no_float32
-static _ubjson_encoder_prefs_t _ubjson_encoder_prefs_defaults = { NULL, 0, 0, 1 };
+// container_count, sort_keys, no_float32, typed_arrays, check_circular
+static _ubjson_encoder_prefs_t _ubjson_encoder_prefs_defaults = { NULL, 0, 0, 1, 0, 1 };
 
 // no_bytes, object_pairs_hook
 static _ubjson_decoder_prefs_t _ubjson_decoder_prefs_defaults = { NULL, NULL, 0, 0 };
@@ -34,8 +34,9 @@ PyDoc_STRVAR(_ubjson_dump__doc__, "See pure Python version (encoder.dump) for do
 #define FUNC_DEF_DUMP {"dump", (PyCFunction)_ubjson_dump, METH_VARARGS | METH_KEYWORDS, _ubjson_dump__doc__}
 static PyObject*
 _ubjson_dump(PyObject *self, PyObject *args, PyObject *kwargs) {
-    static const char *format = "OO|iiiO:dump";
-    static char *keywords[] = {"obj", "fp", "container_count", "sort_keys", "no_float32", "default", NULL};
+    static const char *format = "OO|iiiOii:dump";
+    static char *keywords[] = {"obj", "fp", "container_count", "sort_keys", "no_float32", "default", "typed_arrays",
+                               "check_circular", NULL};
 
     _ubjson_encoder_buffer_t *buffer = NULL;
     _ubjson_encoder_prefs_t prefs = _ubjson_encoder_prefs_defaults;
@@ -45,7 +46,8 @@ _ubjson_dump(PyObject *self, PyObject *args, PyObject *kwargs) {
     UNUSED(self);
 
     if (!PyArg_ParseTupleAndKeywords(args, kwargs, format, keywords, &obj, &fp, &prefs.container_count,
-                                     &prefs.sort_keys, &prefs.no_float32, &prefs.default_func)) {
+                                     &prefs.sort_keys, &prefs.no_float32, &prefs.default_func, &prefs.typed_arrays,
+                                     &prefs.check_circular)) {
         goto bail;
     }
     BAIL_ON_NULL(fp_write = PyObject_GetAttrString(fp, "write"));
@@ -68,8 +70,9 @@ PyDoc_STRVAR(_ubjson_dumpb__doc__, "See pure Python version (encoder.dumpb) for
 #define FUNC_DEF_DUMPB {"dumpb", (PyCFunction)_ubjson_dumpb, METH_VARARGS | METH_KEYWORDS, _ubjson_dumpb__doc__}
 static PyObject*
 _ubjson_dumpb(PyObject *self, PyObject *args, PyObject *kwargs) {
-    static const char *format = "O|iiiO:dumpb";
-    static char *keywords[] = {"obj", "container_count", "sort_keys", "no_float32", "default", NULL};
+    static const char *format = "O|iiiOii:dumpb";
+    static char *keywords[] = {"obj", "container_count", "sort_keys", "no_float32", "default", "typed_arrays",
+                               "check_circular", NULL};
 
     _ubjson_encoder_buffer_t *buffer = NULL;
     _ubjson_encoder_prefs_t prefs = _ubjson_encoder_prefs_defaults;
@@ -77,7 +80,8 @@ _ubjson_dumpb(PyObject *self, PyObject *args, PyObject *kwargs) {
     UNUSED(self);
 
     if (!PyArg_ParseTupleAndKeywords(args, kwargs, format, keywords, &obj, &prefs.container_count, &prefs.sort_keys,
-                                     &prefs.no_float32, &prefs.default_func)) {
+                                     &prefs.no_float32, &prefs.default_func, &prefs.typed_arrays,
+                                     &prefs.check_circular)) {
         goto bail;
     }
 
@@ -106,6 +110,7 @@ _ubjson_load(PyObject *self, PyObject *args, PyObject *kwargs) {
     PyObject *fp;
     PyObject *fp_read = NULL;
     PyObject *fp_seek = NULL;
+    PyObject *fp_readinto = NULL;
     PyObject *seekable = NULL;
     PyObject *obj = NULL;
     UNUSED(self);
@@ -132,10 +137,17 @@ _ubjson_load(PyObject *self, PyObject *args, PyObject *kwargs) {
     // ignore seekable() / seek get errors
     PyErr_Clear();
 
-    BAIL_ON_NULL(buffer = _ubjson_decoder_buffer_create(&prefs, fp_read, fp_seek));
+    // reading directly into existing buffer is optional
+    if (NULL != (fp_readinto = PyObject_GetAttrString(fp, "readinto")) && !PyCallable_Check(fp_readinto)) {
+        Py_CLEAR(fp_readinto);
+    }
+    PyErr_Clear();
+
+    BAIL_ON_NULL(buffer = _ubjson_decoder_buffer_create(&prefs, fp_read, fp_seek, fp_readinto));
     // buffer creation has added references
     Py_CLEAR(fp_read);
     Py_CLEAR(fp_seek);
+    Py_CLEAR(fp_readinto);
 
     BAIL_ON_NULL(obj = _ubjson_decode_value(buffer, NULL));
     BAIL_ON_NONZERO(_ubjson_decoder_buffer_free(&buffer));
@@ -144,6 +156,7 @@ _ubjson_load(PyObject *self, PyObject *args, PyObject *kwargs) {
 bail:
     Py_XDECREF(fp_read);
     Py_XDECREF(fp_seek);
+    Py_XDECREF(fp_readinto);
     Py_XDECREF(obj);
     _ubjson_decoder_buffer_free(&buffer);
     return NULL;
@@ -175,7 +188,7 @@ _ubjson_loadb(PyObject *self, PyObject *args, PyObject *kwargs) {
         goto bail;
     }
 
-    BAIL_ON_NULL(buffer = _ubjson_decoder_buffer_create(&prefs, chars, NULL));
+    BAIL_ON_NULL(buffer = _ubjson_decoder_buffer_create(&prefs, chars, NULL, NULL));
 
     BAIL_ON_NULL(obj = _ubjson_decode_value(buffer, NULL));
     BAIL_ON_NONZERO(_ubjson_decoder_buffer_free(&buffer));
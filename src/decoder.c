@@ -102,6 +102,18 @@
 // io.SEEK_CUR constant (for seek() function)
 #define IO_SEEK_CUR 1
 
+// memoryview of existing memory (needed for readinto) only available from v3.3
+#if PY_VERSION_HEX >= 0x03030000
+#   define USE_READINTO
+#endif
+
+// presized dict creation not part of public API & no longer exported from v3.13 (nor available in PyPy)
+#if !defined(PYPY_VERSION) && PY_VERSION_HEX < 0x030D0000
+#   define USE_DICT_PRESIZED
+#endif
+// upper limit of count (as specified in input) by which to presize a dict
+#define DICT_PRESIZE_MAX 65536
+
 
 static PyObject *DecoderException = NULL;
 static PyTypeObject *PyDec_Type = NULL;
@@ -125,6 +137,9 @@ typedef struct {
 static const char* _decoder_buffer_read_fixed(_ubjson_decoder_buffer_t *buffer, Py_ssize_t *len, char *dst_buffer);
 static const char* _decoder_buffer_read_callable(_ubjson_decoder_buffer_t *buffer, Py_ssize_t *len, char *dst_buffer);
 static const char* _decoder_buffer_read_buffered(_ubjson_decoder_buffer_t *buffer, Py_ssize_t *len, char *dst_buffer);
+#ifdef USE_READINTO
+static Py_ssize_t _decoder_buffer_readinto(_ubjson_decoder_buffer_t *buffer, char *dst_buffer, Py_ssize_t len);
+#endif
 
 //These functions return NULL on failure (an exception will have been set). Note that no type checking is performed!
 
@@ -147,10 +162,11 @@ static PyObject* _decode_object(_ubjson_decoder_buffer_t *buffer);
 /******************************************************************************/
 
 /* Returns new decoder buffer or NULL on failure (an exception will be set). Input must either support buffer interface
- * or be callable. Currently only increases reference count for input parameter.
+ * or be callable. Seek & readinto (both optional) only apply to callable input. Currently only increases reference count
+ * for input, seek & readinto parameters.
  */
 _ubjson_decoder_buffer_t* _ubjson_decoder_buffer_create(_ubjson_decoder_prefs_t* prefs, PyObject *input,
-                                                        PyObject *seek) {
+                                                        PyObject *seek, PyObject *readinto) {
     _ubjson_decoder_buffer_t *buffer;
 
     if (NULL == (buffer = calloc(1, sizeof(_ubjson_decoder_buffer_t)))) {
@@ -174,6 +190,10 @@ _ubjson_decoder_buffer_t* _ubjson_decoder_buffer_create(_ubjson_decoder_prefs_t*
             buffer->seek = seek;
             Py_INCREF(seek);
         }
+#ifdef USE_READINTO
+        buffer->readinto = readinto;
+        Py_XINCREF(readinto);
+#endif
     } else {
         // Should have been checked a level above
         PyErr_SetString(PyExc_TypeError, "Input neither support buffer interface nor is callable");
@@ -230,6 +250,7 @@ int _ubjson_decoder_buffer_free(_ubjson_decoder_buffer_t **buffer) {
         }
         Py_CLEAR((*buffer)->input);
         Py_CLEAR((*buffer)->seek);
+        Py_CLEAR((*buffer)->readinto);
         free(*buffer);
         *buffer = NULL;
     }
@@ -281,6 +302,19 @@ static const char* _decoder_buffer_read_callable(_ubjson_decoder_buffer_t *buffe
         buffer->view_set = 0;
     }
 
+#ifdef USE_READINTO
+    // avoid intermediate bytes instance when caller has provided own destination
+    if (NULL != dst_buffer && NULL != buffer->readinto) {
+        BAIL_ON_NEGATIVE(*len = _decoder_buffer_readinto(buffer, dst_buffer, *len));
+        // no input remaining
+        if (0 == *len) {
+            return NULL;
+        }
+        buffer->total_read += *len;
+        return dst_buffer;
+    }
+#endif
+
     // read input and get buffer view
     BAIL_ON_NULL(read_result = PyObject_CallFunction(buffer->input, "n", *len));
     BAIL_ON_NONZERO(PyObject_GetBuffer(read_result, &buffer->view, PyBUF_SIMPLE));
@@ -350,6 +384,26 @@ static const char* _decoder_buffer_read_buffered(_ubjson_decoder_buffer_t *buffe
             buffer->pos = 0;
         }
 
+#ifdef USE_READINTO
+        /* Large reads into caller-provided destination bypass the intermediate buffer. (Nothing beyond what was
+         * requested is read so there is no need to seek back either.)
+         */
+        if (NULL != dst_buffer && NULL != buffer->readinto && (*len - remaining_old) >= BUFFER_FP_SIZE) {
+            Py_ssize_t readinto_len;
+
+            BAIL_ON_NEGATIVE(readinto_len = _decoder_buffer_readinto(buffer, &tmp_dst[remaining_old],
+                                                                     *len - remaining_old));
+            // no input remaining
+            if (0 == remaining_old && 0 == readinto_len) {
+                *len = 0;
+                return NULL;
+            }
+            *len = remaining_old + readinto_len;
+            buffer->total_read += readinto_len;
+            return tmp_dst;
+        }
+#endif
+
         // read input and get buffer view
         BAIL_ON_NULL(read_result = PyObject_CallFunction(buffer->input, "n",
                                                          MAX(BUFFER_FP_SIZE, (*len - remaining_old))));
@@ -390,6 +444,45 @@ bail:
     return NULL;
 }
 
+#ifdef USE_READINTO
+/* Reads up to len bytes from input directly into dst_buffer via readinto. Returns number of bytes read (zero if no input
+ * remaining) or -1 on failure (an exception will have been set).
+ */
+static Py_ssize_t _decoder_buffer_readinto(_ubjson_decoder_buffer_t *buffer, char *dst_buffer, Py_ssize_t len) {
+    PyObject *view = NULL;
+    PyObject *readinto_result = NULL;
+    PyObject *release_result;
+    Py_ssize_t read;
+
+    BAIL_ON_NULL(view = PyMemoryView_FromMemory(dst_buffer, len, PyBUF_WRITE));
+    BAIL_ON_NULL(readinto_result = PyObject_CallFunctionObjArgs(buffer->readinto, view, NULL));
+    // ensure destination cannot be accessed via view after this call
+    BAIL_ON_NULL(release_result = PyObject_CallMethod(view, "release", NULL));
+    Py_DECREF(release_result);
+    Py_CLEAR(view);
+
+    // non-blocking stream without any data available
+    if (Py_None == readinto_result) {
+        read = 0;
+    } else {
+        read = PyNumber_AsSsize_t(readinto_result, PyExc_OverflowError);
+        if (-1 == read && PyErr_Occurred()) {
+            goto bail;
+        }
+        if (read < 0 || read > len) {
+            PyErr_SetString(PyExc_ValueError, "readinto returned invalid length");
+            goto bail;
+        }
+    }
+    Py_DECREF(readinto_result);
+    return read;
+
+bail:
+    Py_XDECREF(view);
+    Py_XDECREF(readinto_result);
+    return -1;
+}
+#endif
 
 /******************************************************************************/
 
@@ -899,7 +992,16 @@ static PyObject* _decode_object(_ubjson_decoder_buffer_t *buffer) {
     }
     marker = params.marker;
 
-    BAIL_ON_NULL(obj = PyDict_New());
+#ifdef USE_DICT_PRESIZED
+    if (params.counting) {
+        // count in input is untrusted, so do not preallocate arbitrarily large dict
+        BAIL_ON_NULL(obj = _PyDict_NewPresized((Py_ssize_t)(params.count < DICT_PRESIZE_MAX ? params.count
+                                                                                             : DICT_PRESIZE_MAX)));
+    } else
+#endif
+    {
+        BAIL_ON_NULL(obj = PyDict_New());
+    }
 
     // special case: no data values (keys only)
     if (params.counting && _is_no_data_type(params.type)) {
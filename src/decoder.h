@@ -37,6 +37,8 @@ typedef struct _ubjson_decoder_buffer_t {
     PyObject *input;
     // NULL unless input supports seeking in which case expecting callable with signature of io.IOBase.seek()
     PyObject *seek;
+    // NULL unless input supports reading into existing buffer (with signature of io.RawIOBase.readinto())
+    PyObject *readinto;
     // function used to read data from this buffer with (depending on whether fixed, callable or seekable)
     const char* (*read_func)(struct _ubjson_decoder_buffer_t *buffer, Py_ssize_t *len, char *dst_buffer);
     // buffer protocol access to raw bytes of input
@@ -55,7 +57,7 @@ typedef struct _ubjson_decoder_buffer_t {
 /******************************************************************************/
 
 extern _ubjson_decoder_buffer_t* _ubjson_decoder_buffer_create(_ubjson_decoder_prefs_t* prefs,
-                                                               PyObject *input, PyObject *seek);
+                                                               PyObject *input, PyObject *seek, PyObject *readinto);
 extern int _ubjson_decoder_buffer_free(_ubjson_decoder_buffer_t **buffer);
 extern int _ubjson_decoder_init(void);
 // note: marker argument only used internally - supply NULL
@@ -36,10 +36,16 @@ static char bytes_array_prefix[] = {ARRAY_START, CONTAINER_TYPE, TYPE_UINT8, CON
 #define BUFFER_INITIAL_SIZE 64
 // encoder buffer size when using fp (i.e. minimum number of bytes to buffer before writing out)
 #define BUFFER_FP_SIZE 256
+// minimum number of items a sequence must have to be considered for encoding as typed array
+#define TYPED_ARRAY_MIN_LENGTH 4
+// size of chunks in which array.array values are converted & written
+#define TYPED_ARRAY_CHUNK_SIZE 1024
 
 static PyObject *EncoderException = NULL;
 static PyTypeObject *PyDec_Type = NULL;
 #define PyDec_Check(v) PyObject_TypeCheck(v, PyDec_Type)
+static PyTypeObject *PyArrayArray_Type = NULL;
+#define PyArrayArray_Check(v) PyObject_TypeCheck(v, PyArrayArray_Type)
 
 /******************************************************************************/
 
@@ -72,8 +78,13 @@ static int _encode_longlong(long long num, _ubjson_encoder_buffer_t *buffer);
 #if PY_MAJOR_VERSION < 3
 static int _encode_PyInt(PyObject *obj, _ubjson_encoder_buffer_t *buffer);
 #endif
+#if PY_MAJOR_VERSION >= 3
+static int _encode_array_array(PyObject *obj, _ubjson_encoder_buffer_t *buffer, int *encoded);
+#endif
+static int _encode_PySequence_typed(PyObject *seq, Py_ssize_t len, _ubjson_encoder_buffer_t *buffer, int *encoded);
 static int _encode_PySequence(PyObject *obj, _ubjson_encoder_buffer_t *buffer);
 static int _encode_mapping_key(PyObject *obj, _ubjson_encoder_buffer_t *buffer);
+static int _encode_PyDict_items(PyObject *obj, _ubjson_encoder_buffer_t *buffer);
 static int _encode_PyMapping(PyObject *obj, _ubjson_encoder_buffer_t *buffer);
 
 /******************************************************************************/
@@ -94,7 +105,10 @@ _ubjson_encoder_buffer_t* _ubjson_encoder_buffer_create(_ubjson_encoder_prefs_t*
     buffer->raw = PyBytes_AS_STRING(buffer->obj);
     buffer->pos = 0;
 
-    BAIL_ON_NULL(buffer->markers = PySet_New(NULL));
+    // ids of containers currently being encoded (only if checking for circular references)
+    if (prefs->check_circular) {
+        BAIL_ON_NULL(buffer->markers = PySet_New(NULL));
+    }
 
     buffer->prefs = *prefs;
     buffer->fp_write = fp_write;
@@ -292,13 +306,18 @@ bail:
 /******************************************************************************/
 
 static int _encode_PyUnicode(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
-    PyObject *str;
+    PyObject *str = NULL;
     const char *raw;
     Py_ssize_t len;
 
+#if PY_VERSION_HEX >= 0x03030000
+    // avoids intermediate bytes object (buffer is owned by obj)
+    BAIL_ON_NULL(raw = PyUnicode_AsUTF8AndSize(obj, &len));
+#else
     BAIL_ON_NULL(str = PyUnicode_AsEncodedString(obj, "utf-8", NULL));
     raw = PyBytes_AS_STRING(str);
     len = PyBytes_GET_SIZE(str);
+#endif
 
     if (1 == len) {
         WRITE_CHAR_OR_BAIL(TYPE_CHAR);
@@ -307,7 +326,7 @@ static int _encode_PyUnicode(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
         BAIL_ON_NONZERO(_encode_longlong(len, buffer));
     }
     WRITE_OR_BAIL(raw, len);
-    Py_DECREF(str);
+    Py_XDECREF(str);
     return 0;
 
 bail:
@@ -467,45 +486,289 @@ static int _encode_PyInt(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
 
 /******************************************************************************/
 
+// Retrieves value of exact (non-bool) integer, setting *is_int to zero if item is not such an integer or does not fit.
+static int _typed_array_int_value(PyObject *item, long long *num, int *is_int) {
+    int overflow;
+
+    *is_int = 1;
+    if (PyLong_CheckExact(item)) {
+        *num = PyLong_AsLongLongAndOverflow(item, &overflow);
+        if (overflow) {
+            *is_int = 0;
+        } else if (-1 == *num && PyErr_Occurred()) {
+            return 1;
+        }
+#if PY_MAJOR_VERSION < 3
+    } else if (PyInt_CheckExact(item)) {
+        *num = PyInt_AS_LONG(item);
+#endif
+    } else {
+        *is_int = 0;
+    }
+    return 0;
+}
+
+/* Encodes (fast) sequence as typed array if it consists solely of integers or finite floats, setting *encoded to
+ * non-zero if it did so.
+ */
+static int _encode_PySequence_typed(PyObject *seq, Py_ssize_t len, _ubjson_encoder_buffer_t *buffer, int *encoded) {
+    char numtmp[9]; // large enough to hold type + maximum integer/float
+    char header[4] = {ARRAY_START, CONTAINER_TYPE, 0, CONTAINER_COUNT};
+    PyObject *item;
+    long long num = 0;
+    long long lowest = 0;
+    long long highest = 0;
+    double fnum;
+    double fabs_value;
+    int is_int;
+    int use_float32;
+    size_t size;
+    Py_ssize_t i;
+
+    *encoded = 0;
+    if (len < TYPED_ARRAY_MIN_LENGTH) {
+        return 0;
+    }
+    item = PySequence_Fast_GET_ITEM(seq, 0);
+
+    if (PyFloat_CheckExact(item)) {
+        use_float32 = !buffer->prefs.no_float32;
+        for (i = 0; i < len; i++) {
+            item = PySequence_Fast_GET_ITEM(seq, i);
+            if (!PyFloat_CheckExact(item)) {
+                return 0;
+            }
+            fnum = PyFloat_AS_DOUBLE(item);
+            if (!Py_IS_FINITE(fnum)) {
+                return 0;
+            }
+            fabs_value = fabs(fnum);
+            if (use_float32 && 0 != fabs_value && (1.18e-38 > fabs_value || 3.4e38 < fabs_value)) {
+                use_float32 = 0;
+            }
+        }
+        header[2] = use_float32 ? TYPE_FLOAT32 : TYPE_FLOAT64;
+        WRITE_OR_BAIL(header, 4);
+        BAIL_ON_NONZERO(_encode_longlong(len, buffer));
+        for (i = 0; i < len; i++) {
+            fnum = PyFloat_AS_DOUBLE(PySequence_Fast_GET_ITEM(seq, i));
+            if (use_float32) {
+                BAIL_ON_NONZERO(_pyfuncs_ubj_PyFloat_Pack4(fnum, (unsigned char*)numtmp, 0));
+                WRITE_OR_BAIL(numtmp, 4);
+            } else {
+                BAIL_ON_NONZERO(_pyfuncs_ubj_PyFloat_Pack8(fnum, (unsigned char*)numtmp, 0));
+                WRITE_OR_BAIL(numtmp, 8);
+            }
+        }
+
+    } else {
+        for (i = 0; i < len; i++) {
+            BAIL_ON_NONZERO(_typed_array_int_value(PySequence_Fast_GET_ITEM(seq, i), &num, &is_int));
+            if (!is_int) {
+                return 0;
+            }
+            if (0 == i) {
+                lowest = highest = num;
+            } else if (num < lowest) {
+                lowest = num;
+            } else if (num > highest) {
+                highest = num;
+            }
+        }
+        // uint8 is not used since such arrays are decoded as bytes
+        if (lowest >= -(POWER_TWO(7)) && highest < POWER_TWO(7)) {
+            header[2] = TYPE_INT8;
+            size = 1;
+        } else if (lowest >= -(POWER_TWO(15)) && highest < POWER_TWO(15)) {
+            header[2] = TYPE_INT16;
+            size = 2;
+        } else if (lowest >= -(POWER_TWO(31)) && highest < POWER_TWO(31)) {
+            header[2] = TYPE_INT32;
+            size = 4;
+        } else {
+            header[2] = TYPE_INT64;
+            size = 8;
+        }
+        WRITE_OR_BAIL(header, 4);
+        BAIL_ON_NONZERO(_encode_longlong(len, buffer));
+        for (i = 0; i < len; i++) {
+            // cannot fail, as established above
+            _typed_array_int_value(PySequence_Fast_GET_ITEM(seq, i), &num, &is_int);
+            WRITE_INT_INTO_NUMTMP(num, size);
+            WRITE_OR_BAIL(&numtmp[1], size);
+        }
+    }
+
+    *encoded = 1;
+    return 0;
+
+bail:
+    return 1;
+}
+
+#if PY_MAJOR_VERSION >= 3
+/* Encodes array.array as typed array (of the type matching its typecode) without converting values to Python objects,
+ * setting *encoded to non-zero if it did so. (Not supported in Python 2 since its array.array does not implement the
+ * new buffer protocol.)
+ */
+static int _encode_array_array(PyObject *obj, _ubjson_encoder_buffer_t *buffer, int *encoded) {
+    char chunk[TYPED_ARRAY_CHUNK_SIZE];
+    char header[4] = {ARRAY_START, CONTAINER_TYPE, 0, CONTAINER_COUNT};
+    Py_buffer view;
+    int have_view = 0;
+    int is_float;
+    char format;
+    const char *raw;
+    double fnum;
+    Py_ssize_t count;
+    Py_ssize_t i;
+    size_t size;
+    size_t out_size;
+    size_t chunk_pos = 0;
+#ifndef WORDS_BIGENDIAN
+    size_t j;
+#endif
+
+    *encoded = 0;
+    BAIL_ON_NONZERO(PyObject_GetBuffer(obj, &view, PyBUF_FORMAT | PyBUF_ND));
+    have_view = 1;
+    raw = (const char*)view.buf;
+    size = (size_t)view.itemsize;
+    count = view.len / view.itemsize;
+    format = (NULL != view.format && '\0' != view.format[0] && '\0' == view.format[1]) ? view.format[0] : '\0';
+
+    if (count < TYPED_ARRAY_MIN_LENGTH) {
+        goto done;
+    }
+
+    switch (format) {
+        case 'b': case 'h': case 'i': case 'l': case 'q':
+            switch (size) {
+                case 1: header[2] = TYPE_INT8; break;
+                case 2: header[2] = TYPE_INT16; break;
+                case 4: header[2] = TYPE_INT32; break;
+                case 8: header[2] = TYPE_INT64; break;
+                default: goto done;
+            }
+            is_float = 0;
+            out_size = size;
+            break;
+        case 'f': case 'd':
+            for (i = 0; i < count; i++) {
+                fnum = ('f' == format) ? ((const float*)raw)[i] : ((const double*)raw)[i];
+                if (!Py_IS_FINITE(fnum)) {
+                    goto done;
+                }
+            }
+            if ('f' == format && !buffer->prefs.no_float32) {
+                header[2] = TYPE_FLOAT32;
+                out_size = 4;
+            } else {
+                header[2] = TYPE_FLOAT64;
+                out_size = 8;
+            }
+            is_float = 1;
+            break;
+        default:
+            goto done;
+    }
+
+    WRITE_OR_BAIL(header, 4);
+    BAIL_ON_NONZERO(_encode_longlong(count, buffer));
+    for (i = 0; i < count; i++) {
+        if (chunk_pos + out_size > TYPED_ARRAY_CHUNK_SIZE) {
+            WRITE_OR_BAIL(chunk, chunk_pos);
+            chunk_pos = 0;
+        }
+        if (is_float) {
+            fnum = ('f' == format) ? ((const float*)raw)[i] : ((const double*)raw)[i];
+            if (4 == out_size) {
+                BAIL_ON_NONZERO(_pyfuncs_ubj_PyFloat_Pack4(fnum, (unsigned char*)&chunk[chunk_pos], 0));
+            } else {
+                BAIL_ON_NONZERO(_pyfuncs_ubj_PyFloat_Pack8(fnum, (unsigned char*)&chunk[chunk_pos], 0));
+            }
+        } else {
+#ifdef WORDS_BIGENDIAN
+            memcpy(&chunk[chunk_pos], &raw[i * size], size);
+#else
+            for (j = 0; j < size; j++) {
+                chunk[chunk_pos + j] = raw[(i + 1) * size - 1 - j];
+            }
+#endif
+        }
+        chunk_pos += out_size;
+    }
+    WRITE_OR_BAIL(chunk, chunk_pos);
+    *encoded = 1;
+
+done:
+    PyBuffer_Release(&view);
+    return 0;
+
+bail:
+    if (have_view) {
+        PyBuffer_Release(&view);
+    }
+    return 1;
+}
+#endif
+
 static int _encode_PySequence(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
-    PyObject *ident;        // id of sequence (for checking circular reference)
+    PyObject *ident = NULL; // id of sequence (for checking circular reference)
     PyObject *seq = NULL;   // converted sequence (via PySequence_Fast)
     Py_ssize_t len;
     Py_ssize_t i;
     int seen;
+    int encoded = 0;
 
     // circular reference check
-    BAIL_ON_NULL(ident = PyLong_FromVoidPtr(obj));
-    if ((seen = PySet_Contains(buffer->markers, ident))) {
-        if (-1 != seen) {
-            PyErr_SetString(PyExc_ValueError, "Circular reference detected");
+    if (NULL != buffer->markers) {
+        BAIL_ON_NULL(ident = PyLong_FromVoidPtr(obj));
+        if ((seen = PySet_Contains(buffer->markers, ident))) {
+            if (-1 != seen) {
+                PyErr_SetString(PyExc_ValueError, "Circular reference detected");
+            }
+            goto bail;
         }
-        goto bail;
+        BAIL_ON_NONZERO(PySet_Add(buffer->markers, ident));
     }
-    BAIL_ON_NONZERO(PySet_Add(buffer->markers, ident));
 
-    BAIL_ON_NULL(seq = PySequence_Fast(obj, "_encode_PySequence expects sequence"));
-    len = PySequence_Fast_GET_SIZE(seq);
-
-    WRITE_CHAR_OR_BAIL(ARRAY_START);
-    if (buffer->prefs.container_count) {
-        WRITE_CHAR_OR_BAIL(CONTAINER_COUNT);
-        BAIL_ON_NONZERO(_encode_longlong(len, buffer));
+#if PY_MAJOR_VERSION >= 3
+    if (buffer->prefs.typed_arrays && PyArrayArray_Check(obj)) {
+        BAIL_ON_NONZERO(_encode_array_array(obj, buffer, &encoded));
     }
+#endif
 
-    for (i = 0; i < len; i++) {
-        BAIL_ON_NONZERO(_ubjson_encode_value(PySequence_Fast_GET_ITEM(seq, i), buffer));
+    if (!encoded) {
+        BAIL_ON_NULL(seq = PySequence_Fast(obj, "_encode_PySequence expects sequence"));
+        len = PySequence_Fast_GET_SIZE(seq);
+
+        if (buffer->prefs.typed_arrays) {
+            BAIL_ON_NONZERO(_encode_PySequence_typed(seq, len, buffer, &encoded));
+        }
     }
 
-    if (!buffer->prefs.container_count) {
-        WRITE_CHAR_OR_BAIL(ARRAY_END);
+    if (!encoded) {
+        WRITE_CHAR_OR_BAIL(ARRAY_START);
+        if (buffer->prefs.container_count) {
+            WRITE_CHAR_OR_BAIL(CONTAINER_COUNT);
+            BAIL_ON_NONZERO(_encode_longlong(len, buffer));
+        }
+
+        for (i = 0; i < len; i++) {
+            BAIL_ON_NONZERO(_ubjson_encode_value(PySequence_Fast_GET_ITEM(seq, i), buffer));
+        }
+
+        if (!buffer->prefs.container_count) {
+            WRITE_CHAR_OR_BAIL(ARRAY_END);
+        }
     }
 
-    if (-1 == PySet_Discard(buffer->markers, ident)) {
+    if (NULL != ident && -1 == PySet_Discard(buffer->markers, ident)) {
         goto bail;
     }
-    Py_DECREF(ident);
-    Py_DECREF(seq);
+    Py_XDECREF(ident);
+    Py_XDECREF(seq);
     return 0;
 
 bail:
@@ -522,7 +785,12 @@ static int _encode_mapping_key(PyObject *obj, _ubjson_encoder_buffer_t *buffer)
     Py_ssize_t len;
 
     if (PyUnicode_Check(obj)) {
+#if PY_VERSION_HEX >= 0x03030000
+        // avoids intermediate bytes object (buffer is owned by obj)
+        BAIL_ON_NULL(raw = PyUnicode_AsUTF8AndSize(obj, &len));
+#else
         BAIL_ON_NULL(str = PyUnicode_AsEncodedString(obj, "utf-8", NULL));
+#endif
     }
 #if PY_MAJOR_VERSION < 3
     else if (PyString_Check(obj)) {
@@ -534,11 +802,13 @@ static int _encode_mapping_key(PyObject *obj, _ubjson_encoder_buffer_t *buffer)
         goto bail;
     }
 
-    raw = PyBytes_AS_STRING(str);
-    len = PyBytes_GET_SIZE(str);
+    if (NULL != str) {
+        raw = PyBytes_AS_STRING(str);
+        len = PyBytes_GET_SIZE(str);
+    }
     BAIL_ON_NONZERO(_encode_longlong(len, buffer));
     WRITE_OR_BAIL(raw, len);
-    Py_DECREF(str);
+    Py_XDECREF(str);
     return 0;
 
 bail:
@@ -546,59 +816,120 @@ bail:
     return 1;
 }
 
+/* Encodes contents (but not start/end markers) of dict by walking it directly (i.e. without creating a list of items
+ * first).
+ */
+static int _encode_PyDict_items(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
+    PyObject *key = NULL;
+    PyObject *value = NULL;
+    Py_ssize_t pos = 0;
+    Py_ssize_t size = PyDict_Size(obj);
+
+    while (PyDict_Next(obj, &pos, &key, &value)) {
+        // (borrowed) references must remain valid even if encoding (e.g. via default function) modifies dict
+        Py_INCREF(key);
+        Py_INCREF(value);
+        BAIL_ON_NONZERO(_encode_mapping_key(key, buffer));
+        BAIL_ON_NONZERO(_ubjson_encode_value(value, buffer));
+        Py_CLEAR(key);
+        Py_CLEAR(value);
+    }
+    // entries might otherwise have been skipped or repeated (count being incorrect also)
+    if (PyDict_Size(obj) != size) {
+        PyErr_SetString(PyExc_RuntimeError, "dictionary changed size during iteration");
+        goto bail;
+    }
+    return 0;
+
+bail:
+    Py_XDECREF(key);
+    Py_XDECREF(value);
+    return 1;
+}
+
 static int _encode_PyMapping(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
-    PyObject *ident; // id of sequence (for checking circular reference)
+    PyObject *ident = NULL; // id of mapping (for checking circular reference)
     PyObject *items = NULL;
     PyObject *iter = NULL;
     PyObject *item = NULL;
+    Py_ssize_t i;
     int seen;
 
     // circular reference check
-    BAIL_ON_NULL(ident = PyLong_FromVoidPtr(obj));
-    if ((seen = PySet_Contains(buffer->markers, ident))) {
-        if (-1 != seen) {
-            PyErr_SetString(PyExc_ValueError, "Circular reference detected");
+    if (NULL != buffer->markers) {
+        BAIL_ON_NULL(ident = PyLong_FromVoidPtr(obj));
+        if ((seen = PySet_Contains(buffer->markers, ident))) {
+            if (-1 != seen) {
+                PyErr_SetString(PyExc_ValueError, "Circular reference detected");
+            }
+            goto bail;
         }
-        goto bail;
+        BAIL_ON_NONZERO(PySet_Add(buffer->markers, ident));
     }
-    BAIL_ON_NONZERO(PySet_Add(buffer->markers, ident));
 
-    BAIL_ON_NULL(items = PyMapping_Items(obj));
-    if (buffer->prefs.sort_keys) {
+    // plain dict without sorting can be walked directly
+    if (PyDict_CheckExact(obj) && !buffer->prefs.sort_keys) {
+        WRITE_CHAR_OR_BAIL(OBJECT_START);
+        if (buffer->prefs.container_count) {
+            WRITE_CHAR_OR_BAIL(CONTAINER_COUNT);
+            BAIL_ON_NONZERO(_encode_longlong(PyDict_Size(obj), buffer));
+        }
+        BAIL_ON_NONZERO(_encode_PyDict_items(obj, buffer));
+    } else if (PyDict_CheckExact(obj)) {
+        // sorting only keys avoids creating (and comparing) item tuples
+        BAIL_ON_NULL(items = PyDict_Keys(obj));
         BAIL_ON_NONZERO(PyList_Sort(items));
-    }
 
-    WRITE_CHAR_OR_BAIL(OBJECT_START);
-    if (buffer->prefs.container_count) {
-        WRITE_CHAR_OR_BAIL(CONTAINER_COUNT);
-        _encode_longlong(PyList_GET_SIZE(items), buffer);
-    }
+        WRITE_CHAR_OR_BAIL(OBJECT_START);
+        if (buffer->prefs.container_count) {
+            WRITE_CHAR_OR_BAIL(CONTAINER_COUNT);
+            BAIL_ON_NONZERO(_encode_longlong(PyList_GET_SIZE(items), buffer));
+        }
+
+        for (i = 0; i < PyList_GET_SIZE(items); i++) {
+            BAIL_ON_NONZERO(_encode_mapping_key(PyList_GET_ITEM(items, i), buffer));
+            BAIL_ON_NULL(item = PyObject_GetItem(obj, PyList_GET_ITEM(items, i)));
+            BAIL_ON_NONZERO(_ubjson_encode_value(item, buffer));
+            Py_CLEAR(item);
+        }
+    } else {
+        BAIL_ON_NULL(items = PyMapping_Items(obj));
+        if (buffer->prefs.sort_keys) {
+            BAIL_ON_NONZERO(PyList_Sort(items));
+        }
 
-    BAIL_ON_NULL(iter = PyObject_GetIter(items));
-    while (NULL != (item = PyIter_Next(iter))) {
-        if (!PyTuple_Check(item) || 2 != PyTuple_GET_SIZE(item)) {
-            PyErr_SetString(PyExc_ValueError, "items must return 2-tuples");
+        WRITE_CHAR_OR_BAIL(OBJECT_START);
+        if (buffer->prefs.container_count) {
+            WRITE_CHAR_OR_BAIL(CONTAINER_COUNT);
+            BAIL_ON_NONZERO(_encode_longlong(PyList_GET_SIZE(items), buffer));
+        }
+
+        BAIL_ON_NULL(iter = PyObject_GetIter(items));
+        while (NULL != (item = PyIter_Next(iter))) {
+            if (!PyTuple_Check(item) || 2 != PyTuple_GET_SIZE(item)) {
+                PyErr_SetString(PyExc_ValueError, "items must return 2-tuples");
+                goto bail;
+            }
+            BAIL_ON_NONZERO(_encode_mapping_key(PyTuple_GET_ITEM(item, 0), buffer));
+            BAIL_ON_NONZERO(_ubjson_encode_value(PyTuple_GET_ITEM(item, 1), buffer));
+            Py_CLEAR(item);
+        }
+        // for PyIter_Next
+        if (PyErr_Occurred()) {
             goto bail;
         }
-        BAIL_ON_NONZERO(_encode_mapping_key(PyTuple_GET_ITEM(item, 0), buffer));
-        BAIL_ON_NONZERO(_ubjson_encode_value(PyTuple_GET_ITEM(item, 1), buffer));
-        Py_CLEAR(item);
-    }
-    // for PyIter_Next
-    if (PyErr_Occurred()) {
-        goto bail;
     }
 
     if (!buffer->prefs.container_count) {
         WRITE_CHAR_OR_BAIL(OBJECT_END);
     }
 
-    if (-1 == PySet_Discard(buffer->markers, ident)) {
+    if (NULL != ident && -1 == PySet_Discard(buffer->markers, ident)) {
         goto bail;
     }
-    Py_DECREF(iter);
-    Py_DECREF(items);
-    Py_DECREF(ident);
+    Py_XDECREF(iter);
+    Py_XDECREF(items);
+    Py_XDECREF(ident);
     return 0;
 
 bail:
@@ -636,6 +967,11 @@ int _ubjson_encode_value(PyObject *obj, _ubjson_encoder_buffer_t *buffer) {
         BAIL_ON_NONZERO(_encode_PyBytes(obj, buffer));
     } else if (PyByteArray_Check(obj)) {
         BAIL_ON_NONZERO(_encode_PyByteArray(obj, buffer));
+    // exact built-in container types avoid (slower) generic mapping checks below
+    } else if (PyDict_CheckExact(obj)) {
+        RECURSE_AND_BAIL_ON_NONZERO(_encode_PyMapping(obj, buffer), " while encoding a UBJSON object");
+    } else if (PyList_CheckExact(obj) || PyTuple_CheckExact(obj)) {
+        RECURSE_AND_BAIL_ON_NONZERO(_encode_PySequence(obj, buffer), " while encoding a UBJSON array");
     // order important since Mapping could also be Sequence
     } else if (PyMapping_Check(obj)
     // Unfortunately PyMapping_Check is no longer enough, see https://bugs.python.org/issue5945
@@ -684,6 +1020,16 @@ int _ubjson_encoder_init(void) {
         goto bail;
     }
     PyDec_Type = (PyTypeObject*) tmp_obj;
+    tmp_obj = NULL;
+    Py_CLEAR(tmp_module);
+
+    BAIL_ON_NULL(tmp_module = PyImport_ImportModule("array"));
+    BAIL_ON_NULL(tmp_obj = PyObject_GetAttrString(tmp_module, "array"));
+    if (!PyType_Check(tmp_obj)) {
+        PyErr_SetString(PyExc_ImportError, "array.array type import failure");
+        goto bail;
+    }
+    PyArrayArray_Type = (PyTypeObject*) tmp_obj;
     Py_CLEAR(tmp_module);
 
     return 0;
@@ -691,6 +1037,7 @@ int _ubjson_encoder_init(void) {
 bail:
     Py_CLEAR(EncoderException);
     Py_CLEAR(PyDec_Type);
+    Py_CLEAR(PyArrayArray_Type);
     Py_XDECREF(tmp_obj);
     Py_XDECREF(tmp_module);
     return 1;
@@ -700,4 +1047,5 @@ bail:
 void _ubjson_encoder_cleanup(void) {
     Py_CLEAR(EncoderException);
     Py_CLEAR(PyDec_Type);
+    Py_CLEAR(PyArrayArray_Type);
 }
@@ -29,6 +29,8 @@ typedef struct {
     int container_count;
     int sort_keys;
     int no_float32;
+    int typed_arrays;
+    int check_circular;
 } _ubjson_encoder_prefs_t;
 
 typedef struct {
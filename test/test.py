@@ -15,12 +15,14 @@
 
 from sys import version_info, getrecursionlimit, setrecursionlimit
 from functools import partial
+from contextlib import contextmanager
 from io import BytesIO, SEEK_END
 from unittest import TestCase, skipUnless
 from pprint import pformat
 from decimal import Decimal
-from struct import pack
+from struct import pack, Struct
 from collections import OrderedDict
+from array import array
 
 from ubjson import (dump as ubjdump, dumpb as ubjdumpb, load as ubjload, loadb as ubjloadb, EncoderException,
                     DecoderException, EXTENSION_ENABLED)
@@ -44,6 +46,19 @@ else:  # pragma: no cover
         return obj if isinstance(obj, str) else str(obj)
 
 
+class InOutMessage(object):  # pylint: disable=too-few-public-methods
+    """Assertion message showing input & encoded output, only formatted when used (i.e. on assertion failure)"""
+
+    __slots__ = ('obj', 'encoded')
+
+    def __init__(self, obj, encoded):
+        self.obj = obj
+        self.encoded = encoded
+
+    def __str__(self):
+        return '\nInput:\n%s\nOutput (%d):\n%s' % (pformat(self.obj), len(self.encoded), self.encoded)
+
+
 class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-methods
 
     @staticmethod
@@ -54,10 +69,6 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
     def ubjdumpb(obj, *args, **kwargs):
         return ubjpuredumpb(obj, *args, **kwargs)
 
-    @staticmethod
-    def __format_in_out(obj, encoded):
-        return '\nInput:\n%s\nOutput (%d):\n%s' % (pformat(obj), len(encoded), encoded)
-
     if PY2:  # pragma: no cover
         def type_check(self, actual, expected):
             self.assertEqual(actual, expected)
@@ -65,6 +76,15 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
         def type_check(self, actual, expected):
             self.assertEqual(actual, ord(expected))
 
+    if PY2:  # pragma: no cover
+        @contextmanager
+        def sub_test(self, **params):  # pylint: disable=unused-argument
+            """subTest is not available in Python 2, so failures (as before) stop the test"""
+            yield
+    else:  # pragma: no cover
+        def sub_test(self, **params):
+            return self.subTest(**params)
+
     # based on math.isclose available in Python v3.5
     @staticmethod
     # pylint: disable=invalid-name
@@ -91,15 +111,15 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
             self.type_check(encoded[0], expected_type)
         if length is not None:
             assert_func = self.assertGreaterEqual if length_greater_or_equal else self.assertEqual
-            assert_func(len(encoded), length, self.__format_in_out(obj, encoded))
+            assert_func(len(encoded), length, InOutMessage(obj, encoded))
         if approximate:
             self.assertTrue(self.numbers_close(self.ubjloadb(encoded, object_hook=object_hook,
                                                              object_pairs_hook=object_pairs_hook), obj),
-                            msg=self.__format_in_out(obj, encoded))
+                            msg=InOutMessage(obj, encoded))
         else:
             self.assertEqual(self.ubjloadb(encoded, object_hook=object_hook,
                                            object_pairs_hook=object_pairs_hook), obj,
-                             self.__format_in_out(obj, encoded))
+                             InOutMessage(obj, encoded))
 
     def test_no_data(self):
         with self.assertRaises(DecoderException):
@@ -148,6 +168,11 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
         for string in ('some ascii', u(r'\u00a9 with extended\u2122'), u('long string') * 100):
             self.check_enc_dec(string, 4, length_greater_or_equal=True)
 
+        # subclasses are encoded as strings also
+        class MyString(type(u(''))):
+            pass
+        self.assertEqual(self.ubjdumpb(MyString(u('ab'))), self.ubjdumpb(u('ab')))
+
     def test_int(self):
         self.assertEqual(self.ubjdumpb(Decimal(-1.5)),
                          TYPE_HIGH_PREC + TYPE_UINT8 + b'\x04' + '-1.5'.encode('utf-8'))
@@ -172,7 +197,22 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
                 (TYPE_HIGH_PREC, 9223372036854775808, 22),
                 (TYPE_HIGH_PREC, -9223372036854775809, 23),
                 (TYPE_HIGH_PREC, 9999999999999999999999999999999999999, 40)):
-            self.check_enc_dec(value, total_size, expected_type=type_)
+            with self.sub_test(value=value):
+                self.check_enc_dec(value, total_size, expected_type=type_)
+
+        # string representation of subclasses does not affect encoding
+        class MyInt(INTEGER_TYPES[-1]):
+            def __str__(self):
+                return 'not a number'
+        for value in (2 ** 70, -(2 ** 70)):
+            self.assertEqual(self.ubjdumpb(MyInt(value)), self.ubjdumpb(value))
+
+        # integers beyond the str() digit limit of Python 3.11+ (as well as just below it). Not using check_enc_dec
+        # since formatting such a value for an assertion message would itself hit the limit.
+        for value in (10 ** 4299, 10 ** 5000, -(10 ** 5000)):
+            encoded = self.ubjdumpb(value)
+            self.type_check(encoded[0], TYPE_HIGH_PREC)
+            self.assertTrue(self.ubjloadb(encoded) == value)
 
     def test_high_precision(self):
         self.assertEqual(self.ubjdumpb(Decimal(-1.5)),
@@ -190,6 +230,9 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
                 '-1.2345e67890'):
             # minimum length because: marker + length marker + length + value
             self.check_enc_dec(Decimal(value), 4, length_greater_or_equal=True)
+        # repeated values (including long ones)
+        for value in ('1.25', '9' * 100 + '.5'):
+            self.assertEqual(self.ubjloadb(self.ubjdumpb([Decimal(value)] * 3)), [Decimal(value)] * 3)
         # cannot compare equality, so test separately (since these evaluate to "NULL"
         for value in ('nan', '-inf', 'inf'):
             self.assertEqual(self.ubjloadb(self.ubjdumpb(Decimal(value))), None)
@@ -208,16 +251,17 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
                 (TYPE_FLOAT64, 2.23e-308, 9),
                 (TYPE_FLOAT64, 12345.44e40, 9),
                 (TYPE_FLOAT64, 1.8e307, 9)):
-            self.check_enc_dec(value,
-                               total_size,
-                               approximate=True,
-                               expected_type=type_,
-                               no_float32=False)
-            # using only float64 (default)
-            self.check_enc_dec(value,
-                               9 if type_ == TYPE_FLOAT32 else total_size,
-                               approximate=True,
-                               expected_type=(TYPE_FLOAT64 if type_ == TYPE_FLOAT32 else type_))
+            with self.sub_test(value=value):
+                self.check_enc_dec(value,
+                                   total_size,
+                                   approximate=True,
+                                   expected_type=type_,
+                                   no_float32=False)
+                # using only float64 (default)
+                self.check_enc_dec(value,
+                                   9 if type_ == TYPE_FLOAT32 else total_size,
+                                   approximate=True,
+                                   expected_type=(TYPE_FLOAT64 if type_ == TYPE_FLOAT32 else type_))
         for value in ('nan', '-inf', 'inf'):
             for no_float32 in (True, False):
                 self.assertEqual(self.ubjloadb(self.ubjdumpb(float(value), no_float32=no_float32)), None)
@@ -248,9 +292,18 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
                True,
                False,
                [[1, 2], 3, [4, 5, 6], 7],
-               {'a dict': 456}]
+               {'a dict': 456},
+               # empty containers followed by further values
+               [],
+               {},
+               {'empty array': [], 'empty object': {}, 'after': 1},
+               'last']
         for opts in ({'container_count': False}, {'container_count': True}):
             self.check_enc_dec(obj, **opts)
+        # (mostly) homogeneous sequences
+        for obj in (['a', 'b', u('c')], [1, 2, True, 3], [1.5, 2.5, 3, None, 4.5], [b'\x00', b'\x01'], [[], [1]]):
+            for opts in ({'no_float32': True}, {'no_float32': False}):
+                self.check_enc_dec(obj, **opts)
 
     def test_bytes(self):
         # insufficient length
@@ -274,6 +327,22 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
             )
         self.assertEqual(self.ubjloadb(raw_start + b'\x03' + (b'\x01' * 3)), [1, 1, 1])
 
+        # fixed numeric types + count (including more elements than are read in one go by pure-Python decoder)
+        for ubj_type, fmt, values in ((TYPE_INT8, 'b', [-128, 0, 127]),
+                                      (TYPE_UINT8, 'B', [0, 128, 255]),
+                                      (TYPE_INT16, 'h', [-32768, 1, 32767]),
+                                      (TYPE_INT32, 'i', [-2147483648, 2, 2147483647]),
+                                      (TYPE_INT64, 'q', [-9223372036854775808, 3, 9223372036854775807]),
+                                      (TYPE_FLOAT32, 'f', [-1.5, 0.0, 2.25]),
+                                      (TYPE_FLOAT64, 'd', [-1.5, 1e-300, 2.25e300])):
+            for repeat in (1, 5000):
+                obj = values * repeat
+                raw = (ARRAY_START + CONTAINER_TYPE + ubj_type + CONTAINER_COUNT + TYPE_INT32 + pack('>i', len(obj)) +
+                       pack('>%d%s' % (len(obj), fmt), *obj))
+                self.assertEqual(self.ubjloadb(raw, no_bytes=True), obj)
+                with self.assertRaises(DecoderException):
+                    self.ubjloadb(raw[:-1], no_bytes=True)
+
         # invalid type
         with self.assertRaises(DecoderException):
             self.ubjloadb(ARRAY_START + CONTAINER_TYPE + b'\x01')
@@ -293,6 +362,56 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
                                        TYPE_BOOL_FALSE + TYPE_BOOL_TRUE + ARRAY_END),
                          [[], [True], [False, True]])
 
+    def test_array_typed(self):
+        # not used by default
+        self.assertEqual(self.ubjdumpb([1, 2, 3, 4]), (ARRAY_START + TYPE_UINT8 + b'\x01' + TYPE_UINT8 + b'\x02' +
+                                                       TYPE_UINT8 + b'\x03' + TYPE_UINT8 + b'\x04' + ARRAY_END))
+
+        for ubj_type, fmt, values in ((TYPE_INT8, 'b', [-128, 0, 1, 127]),
+                                      (TYPE_INT16, 'h', [0, 1, 2, 255]),
+                                      (TYPE_INT16, 'h', [-32768, 0, 1, 32767]),
+                                      (TYPE_INT32, 'i', [-2147483648, 2, 3, 2147483647]),
+                                      (TYPE_INT64, 'q', [-9223372036854775808, 3, 4, 9223372036854775807]),
+                                      (TYPE_FLOAT64, 'd', [-1.5, 0.0, 2.25, 1e300])):
+            for repeat in (1, 100):
+                obj = values * repeat
+                encoded = self.ubjdumpb(obj, typed_arrays=True)
+                self.assertEqual(encoded, (ARRAY_START + CONTAINER_TYPE + ubj_type + CONTAINER_COUNT +
+                                           self.ubjdumpb(len(obj)) + pack('>%d%s' % (len(obj), fmt), *obj)))
+                self.assertEqual(self.ubjloadb(encoded), obj)
+
+        # float32 only if allowed and suitable for all values
+        self.assertEqual(self.ubjdumpb([-1.5, 0.0, 2.25, 3.0], typed_arrays=True, no_float32=False),
+                         ARRAY_START + CONTAINER_TYPE + TYPE_FLOAT32 + CONTAINER_COUNT + TYPE_UINT8 + b'\x04' +
+                         pack('>4f', -1.5, 0.0, 2.25, 3.0))
+        self.assertEqual(self.ubjdumpb([-1.5, 0.0, 2.25, 1e300], typed_arrays=True, no_float32=False)[2:3],
+                         TYPE_FLOAT64)
+
+        # unsuitable sequences (too short, mixed, bool, non-finite, out of range)
+        for obj in ([1, 2, 3], [1, 2, 3, 4.0], [True, False, True, False], [1.0, 2.0, 3.0, float('nan')],
+                    [1.0, 2.0, 3.0, float('inf')], [1, 2, 3, 2 ** 64], [1, 2, 3, 'a']):
+            self.assertEqual(self.ubjdumpb(obj, typed_arrays=True), self.ubjdumpb(obj))
+
+        # array.array uses type matching its typecode
+        for typecode, ubj_type, fmt, values in (('b', TYPE_INT8, 'b', [-128, 0, 1, 127]),
+                                                ('h', TYPE_INT16, 'h', [0, 1, 2, 3]),
+                                                ('f', TYPE_FLOAT32, 'f', [-1.5, 0.0, 2.25, 3.0]),
+                                                ('d', TYPE_FLOAT64, 'd', [-1.5, 0.0, 2.25, 1e300])):
+            for repeat in (1, 1000):
+                obj = array(typecode, values * repeat)
+                encoded = self.ubjdumpb(obj, typed_arrays=True, no_float32=False)
+                self.assertEqual(encoded, (ARRAY_START + CONTAINER_TYPE + ubj_type + CONTAINER_COUNT +
+                                           self.ubjdumpb(len(obj)) + pack('>%d%s' % (len(obj), fmt), *obj)))
+                self.assertEqual(self.ubjloadb(encoded), obj.tolist())
+        self.assertEqual(self.ubjdumpb(array('f', [1.5] * 4), typed_arrays=True)[2:3], TYPE_FLOAT64)
+        self.assertEqual(self.ubjdumpb(array('d', [1.0, 2.0, 3.0, float('nan')]), typed_arrays=True),
+                         self.ubjdumpb([1.0, 2.0, 3.0, float('nan')]))
+
+        # nested
+        obj = {'a': [[1, 2, 3, 4], (5.0, 6.0, 7.0, 8.0)], 'b': [1, 2]}
+        self.assertEqual(self.ubjloadb(self.ubjdumpb(obj, typed_arrays=True, container_count=True)),
+                         {'a': [[1, 2, 3, 4], [5.0, 6.0, 7.0, 8.0]], 'b': [1, 2]})
+
     def test_array_noop(self):
         # only supported without type
         self.assertEqual(self.ubjloadb(ARRAY_START +
@@ -440,20 +559,34 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
             with self.assertRaises(ValueError):
                 self.ubjdumpb(container)
 
+        # Without the check, exceeding the recursion limit is what stops encoding
+        old_limit = getrecursionlimit()
+        setrecursionlimit(200)
+        try:
+            for container in (sequence, mapping):
+                with self.assert_raises_regex(RuntimeError, 'recursion'):
+                    self.ubjdumpb(container, check_circular=False)
+        finally:
+            setrecursionlimit(old_limit)
+
         # Refering to the same container multiple times is valid however
         sequence = [1, 2, 3]
         mapping = {'a': 1, 'b': 2}
         self.check_enc_dec([sequence, mapping, sequence, mapping])
+        self.check_enc_dec([sequence, mapping, sequence, mapping], check_circular=False)
 
     def test_unencodable(self):
         with self.assertRaises(EncoderException):
             self.ubjdumpb(type(None))
 
     def test_decoder_fuzz(self):
+        # (bound locally since called for each of many inputs)
+        loadb = self.ubjloadb
         for start, end, fmt in ((0, pow(2, 8), '>B'), (pow(2, 8), pow(2, 16), '>H'), (pow(2, 16), pow(2, 18), '>I')):
+            fmt_pack = Struct(fmt).pack
             for i in range(start, end):
                 try:
-                    self.ubjloadb(pack(fmt, i))
+                    loadb(fmt_pack(i))
                 except DecoderException:
                     pass
                 except Exception as ex:  # pragma: no cover  pylint: disable=broad-except
@@ -508,6 +641,16 @@ class TestEncodeDecodePlain(TestCase):  # pylint: disable=too-many-public-method
         self.assertEqual(dumpb_default(obj1), self.ubjdumpb(obj2))
         self.assertEqual(dumpb_default(obj3), self.ubjdumpb(obj4))
 
+        # modification of mapping during encoding
+        obj5 = {'a': obj1, 'b': 2}
+
+        def default_modifying(obj):
+            obj5.pop('b', None)
+            return default(obj)
+
+        with self.assertRaises(RuntimeError):
+            self.ubjdumpb(obj5, default=default_modifying)
+
     def test_decode_object_hook(self):
         with self.assertRaises(TypeError):
             self.check_enc_dec({'a': 1, 'b': 2}, object_hook=int)
@@ -568,6 +711,19 @@ class TestEncodeDecodeFp(TestEncodeDecodePlain):
         with self.assertRaises(DecoderException) as ctx:
             self.ubjloadb(TYPE_STRING + TYPE_INT8 + b'\x01' + b'\xfe' + b'c0fefe' * 4)
         self.assertEqual(ctx.exception.position, 4)
+        # position only included in formatted message
+        message = ctx.exception.args[0]
+        self.assertNotIn('at byte', message)
+        self.assertEqual(str(ctx.exception), '%s (at byte 4)' % message)
+
+        # position of failure within hook's own decoding is retained
+        def failing_hook(_):
+            return self.ubjloadb(TYPE_STRING + TYPE_INT8 + b'\x01' + b'\xfe')
+
+        with self.assertRaises(DecoderException) as ctx:
+            self.ubjloadb(self.ubjdumpb({'a': 'b' * 20}), object_hook=failing_hook)
+        self.assertEqual(ctx.exception.position, 4)
+        self.assertEqual(str(ctx.exception).count('at byte'), 1)
 
     def test_invalid_fp_dump(self):
         with self.assertRaises(AttributeError):
@@ -613,6 +769,24 @@ class TestEncodeDecodeFp(TestEncodeDecodePlain):
         output.seek(0)
         self.assertEqual(self.ubjload(output), obj)
 
+    # Byte arrays larger than extension read buffer (read directly into result if readinto available)
+    def test_fp_bytes_large(self):
+        obj = [b'large' * 1024, 123]
+        encoded = self.ubjdumpb(obj)
+
+        # Seekable and non-seekable runs, with subsequent document
+        for seekable in (True, False):
+            output = BytesIO(encoded * 2)
+            output.seekable = lambda: seekable  # pylint: disable=cell-var-from-loop
+            self.assertEqual(self.ubjload(output), obj)
+            self.assertEqual(self.ubjload(output), obj)
+
+            # insufficient length
+            output = BytesIO(encoded[:-10])
+            output.seekable = lambda: seekable  # pylint: disable=cell-var-from-loop
+            with self.assertRaises(DecoderException):
+                self.ubjload(output)
+
 
 @skipUnless(EXTENSION_ENABLED, 'Extension not enabled')
 class TestEncodeDecodeFpExt(TestEncodeDecodeFp):
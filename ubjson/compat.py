@@ -76,6 +76,18 @@ try:
 except ImportError:
     from collections import Mapping, Sequence  # noqa: F401
 
+try:
+    # introduced in v3.2 (which also introduced array.tobytes)
+    from array import typecodes as ARRAY_TYPECODES  # noqa: F401
+
+    def array_tobytes(obj):
+        return obj.tobytes()
+except ImportError:
+    ARRAY_TYPECODES = 'cbBuhHiIlLfd'
+
+    def array_tobytes(obj):
+        return obj.tostring()
+
 
 if version_info[:2] == (3, 2):
     # pylint: disable=exec-used
@@ -16,7 +16,7 @@
 """UBJSON draft v12 decoder"""
 
 from io import BytesIO
-from struct import Struct, pack, error as StructError
+from struct import Struct, pack, unpack, error as StructError
 from decimal import Decimal, DecimalException
 
 from .compat import raise_from, intern_unicode
@@ -29,6 +29,7 @@ __TYPES = frozenset((TYPE_NULL, TYPE_BOOL_TRUE, TYPE_BOOL_FALSE, TYPE_INT8, TYPE
                      OBJECT_START))
 __TYPES_NO_DATA = frozenset((TYPE_NULL, TYPE_BOOL_FALSE, TYPE_BOOL_TRUE))
 __TYPES_INT = frozenset((TYPE_INT8, TYPE_UINT8, TYPE_INT16, TYPE_INT32, TYPE_INT64))
+__CONTAINER_PARAMS = frozenset((CONTAINER_TYPE, CONTAINER_COUNT))
 
 __SMALL_INTS_DECODED = {pack('>b', i): i for i in range(-128, 128)}
 __SMALL_UINTS_DECODED = {pack('>B', i): i for i in range(256)}
@@ -38,15 +39,37 @@ __UNPACK_INT64 = Struct('>q').unpack
 __UNPACK_FLOAT32 = Struct('>f').unpack
 __UNPACK_FLOAT64 = Struct('>d').unpack
 
+# Struct format character & size (in bytes) of fixed-length numeric types, as used for bulk-decoding typed arrays
+__TYPED_ARRAY_FORMATS = {TYPE_INT8: ('b', 1),
+                         TYPE_UINT8: ('B', 1),
+                         TYPE_INT16: ('h', 2),
+                         TYPE_INT32: ('i', 4),
+                         TYPE_INT64: ('q', 8),
+                         TYPE_FLOAT32: ('f', 4),
+                         TYPE_FLOAT64: ('d', 8)}
+# Maximum number of typed array elements to read & unpack at a time (to limit size of individual reads)
+__TYPED_ARRAY_CHUNK = 8192
+
+# Lengths (including integer type marker) which fit into a single byte. Since all integer types are at least one byte
+# long, the marker & first byte of value can always be read in one go.
+__SMALL_LENGTHS_DECODED = dict([(TYPE_UINT8 + raw, i) for raw, i in __SMALL_UINTS_DECODED.items()] +
+                               [(TYPE_INT8 + raw, i) for raw, i in __SMALL_INTS_DECODED.items() if i >= 0])
+# Number of bytes (excluding first one) & unpacker for lengths which are not (u)int8
+__LENGTH_REMAINDER = {TYPE_INT16: (1, __UNPACK_INT16, 'int16'),
+                      TYPE_INT32: (3, __UNPACK_INT32, 'int32'),
+                      TYPE_INT64: (7, __UNPACK_INT64, 'int64')}
+
 
 class DecoderException(ValueError):
     """Raised when decoding of a UBJSON stream fails."""
 
     def __init__(self, message, position=None):
-        if position is not None:
-            super(DecoderException, self).__init__('%s (at byte %d)' % (message, position), position)
-        else:
-            super(DecoderException, self).__init__(str(message), None)
+        # message including position is only formatted if required (see __str__)
+        super(DecoderException, self).__init__(str(message), position)
+
+    def __str__(self):
+        message, position = self.args  # pylint: disable=unbalanced-tuple-unpacking
+        return message if position is None else '%s (at byte %d)' % (message, position)
 
     @property
     def position(self):
@@ -58,7 +81,10 @@ class DecoderException(ValueError):
 
 # pylint: disable=unused-argument
 def __decode_high_prec(fp_read, marker):
-    length = __decode_int_non_negative(fp_read, fp_read(1))
+    raw = fp_read(2)
+    length = __SMALL_LENGTHS_DECODED.get(raw)
+    if length is None:
+        length = __decode_length(fp_read, raw)
     raw = fp_read(length)
     if len(raw) < length:
         raise DecoderException('High prec. too short')
@@ -79,6 +105,29 @@ def __decode_int_non_negative(fp_read, marker):
     return value
 
 
+# Decodes length (other than non-negative (u)int8 which callers look up directly in __SMALL_LENGTHS_DECODED) given
+# its marker and first byte of value
+def __decode_length(fp_read, raw):
+    marker = raw[:1]
+    if marker in __LENGTH_REMAINDER:
+        remainder, unpack_length, name = __LENGTH_REMAINDER[marker]
+        try:
+            length = unpack_length(raw[1:] + fp_read(remainder))[0]
+        except StructError as ex:
+            raise_from(DecoderException('Failed to unpack %s' % name), ex)
+        if length < 0:
+            raise DecoderException('Negative count/length unexpected')
+        return length
+    # Note: Unlike the extension, the byte following an invalid marker has already been read at this point, so the
+    # reported position is one byte later.
+    if marker not in __TYPES_INT:
+        raise DecoderException('Integer marker expected')
+    # (u)int8 without a value or negative int8
+    if len(raw) < 2:
+        raise DecoderException('Failed to unpack %s' % ('uint8' if marker == TYPE_UINT8 else 'int8'))
+    raise DecoderException('Negative count/length unexpected')
+
+
 def __decode_int8(fp_read, marker):
     try:
         return __SMALL_INTS_DECODED[fp_read(1)]
@@ -139,8 +188,11 @@ def __decode_char(fp_read, marker):
 
 
 def __decode_string(fp_read, marker):
-    # current marker is string identifier, so read next byte which identifies integer type
-    length = __decode_int_non_negative(fp_read, fp_read(1))
+    # current marker is string identifier, so read next bytes which identify integer type & (start of) length
+    raw = fp_read(2)
+    length = __SMALL_LENGTHS_DECODED.get(raw)
+    if length is None:
+        length = __decode_length(fp_read, raw)
     raw = fp_read(length)
     if len(raw) < length:
         raise DecoderException('String too short')
@@ -179,6 +231,10 @@ __METHOD_MAP = {TYPE_NULL: (lambda _, __: None),
 
 def __get_container_params(fp_read, in_mapping, no_bytes):
     marker = fp_read(1)
+    # most common case - neither type nor count, i.e. marker already belongs to first value (or end of container)
+    if marker not in __CONTAINER_PARAMS:
+        # count set to one to indicate that not finished yet
+        return marker, False, 1, TYPE_NONE
     if marker == CONTAINER_TYPE:
         marker = fp_read(1)
         if marker not in __TYPES:
@@ -191,75 +247,114 @@ def __get_container_params(fp_read, in_mapping, no_bytes):
         count = __decode_int_non_negative(fp_read, fp_read(1))
         counting = True
 
-        # special cases (no data (None or bool) / bytes array) will be handled in calling functions
-        if not (type_ in __TYPES_NO_DATA or
-                (type_ == TYPE_UINT8 and not in_mapping and not no_bytes)):
+        # special cases (no data (None or bool) / bytes array) will be handled in calling functions. Empty containers
+        # have no further data (and reading ahead would consume the next value of the parent container).
+        if count and not (type_ in __TYPES_NO_DATA or
+                          (type_ == TYPE_UINT8 and not in_mapping and not no_bytes)):
             # Reading ahead is just to capture type, which will not exist if type is fixed
             marker = fp_read(1) if (in_mapping or type_ == TYPE_NONE) else type_
-
-    elif type_ == TYPE_NONE:
-        # set to one to indicate that not finished yet
-        count = 1
-        counting = False
     else:
         raise DecoderException('Container type without count')
     return marker, counting, count, type_
 
 
+def __decode_container(fp_read, marker, no_bytes, object_hook, object_pairs_hook, intern_object_keys, parent_name):
+    """Decodes nested container value (i.e. one whose marker is not in __METHOD_MAP) within an array or object"""
+    if marker == ARRAY_START:
+        return __decode_array(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys)
+    if marker == OBJECT_START:
+        return __decode_object(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys)
+    raise DecoderException('Invalid marker within %s' % parent_name)
+
+
+def __decode_object_no_data(fp_read, type_, count, object_hook, object_pairs_hook, intern_object_keys):
+    """Decodes (counted) object whose values have a fixed type without data (None or bool)"""
+    value = __METHOD_MAP[type_](fp_read, type_)
+    if object_pairs_hook is not None:
+        return object_pairs_hook([(__decode_object_key(fp_read, fp_read(1), intern_object_keys), value)
+                                  for _ in range(count)])
+    return object_hook({__decode_object_key(fp_read, fp_read(1), intern_object_keys): value for _ in range(count)})
+
+
 def __decode_object(fp_read, no_bytes, object_hook, object_pairs_hook,  # pylint: disable=too-many-branches
                     intern_object_keys):
     marker, counting, count, type_ = __get_container_params(fp_read, True, no_bytes)
-    has_pairs_hook = object_pairs_hook is not None
-    obj = [] if has_pairs_hook else {}
+    obj = [] if object_pairs_hook is not None else {}
 
     # special case - no data (None or bool)
     if type_ in __TYPES_NO_DATA:
-        value = __METHOD_MAP[type_](fp_read, type_)
-        if has_pairs_hook:
-            for _ in range(count):
-                obj.append((__decode_object_key(fp_read, fp_read(1), intern_object_keys), value))
-            return object_pairs_hook(obj)
-
-        for _ in range(count):
-            obj[__decode_object_key(fp_read, fp_read(1), intern_object_keys)] = value
-        return object_hook(obj)
-
-    while count > 0 and (counting or marker != OBJECT_END):
-        if marker == TYPE_NOOP:
-            marker = fp_read(1)
-            continue
+        return __decode_object_no_data(fp_read, type_, count, object_hook, object_pairs_hook, intern_object_keys)
+
+    method_map_get = __METHOD_MAP.get
+
+    # Counted & uncounted containers are handled in separate loops (with duplicated key & value decoding) since a
+    # combined loop requires several more comparisons per value.
+    if counting:
+        # loop-invariant
+        untyped = type_ == TYPE_NONE
+        while count > 0:
+            if marker == TYPE_NOOP:
+                marker = fp_read(1)
+                continue
+
+            # decode key for object
+            key = __decode_object_key(fp_read, marker, intern_object_keys)
+            marker = fp_read(1) if untyped else type_
+
+            # decode value
+            decoder = method_map_get(marker)
+            if decoder is not None:
+                value = decoder(fp_read, marker)
+            else:
+                value = __decode_container(fp_read, marker, no_bytes, object_hook, object_pairs_hook,
+                                           intern_object_keys, 'object')
 
-        # decode key for object
-        key = __decode_object_key(fp_read, marker, intern_object_keys)
-        marker = fp_read(1) if type_ == TYPE_NONE else type_
+            if object_pairs_hook is not None:
+                obj.append((key, value))
+            else:
+                obj[key] = value
+            count -= 1
+            if count:
+                marker = fp_read(1)
 
-        # decode value
-        try:
-            value = __METHOD_MAP[marker](fp_read, marker)
-        except KeyError:
-            handled = False
-        else:
-            handled = True
-
-        # handle outside above except (on KeyError) so do not have unfriendly "exception within except" backtrace
-        if not handled:
-            if marker == ARRAY_START:
-                value = __decode_array(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys)
-            elif marker == OBJECT_START:
-                value = __decode_object(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys)
+    else:
+        while marker != OBJECT_END:
+            if marker == TYPE_NOOP:
+                marker = fp_read(1)
+                continue
+
+            # decode key for object
+            key = __decode_object_key(fp_read, marker, intern_object_keys)
+
+            # decode value
+            marker = fp_read(1)
+            decoder = method_map_get(marker)
+            if decoder is not None:
+                value = decoder(fp_read, marker)
             else:
-                raise DecoderException('Invalid marker within object')
+                value = __decode_container(fp_read, marker, no_bytes, object_hook, object_pairs_hook,
+                                           intern_object_keys, 'object')
 
-        if has_pairs_hook:
-            obj.append((key, value))
-        else:
-            obj[key] = value
-        if counting:
-            count -= 1
-        if count > 0:
+            if object_pairs_hook is not None:
+                obj.append((key, value))
+            else:
+                obj[key] = value
             marker = fp_read(1)
 
-    return object_pairs_hook(obj) if has_pairs_hook else object_hook(obj)
+    return object_pairs_hook(obj) if object_pairs_hook is not None else object_hook(obj)
+
+
+def __decode_typed_array(fp_read, type_, count):
+    fmt, size = __TYPED_ARRAY_FORMATS[type_]
+    container = []
+    while count > 0:
+        chunk = min(count, __TYPED_ARRAY_CHUNK)
+        raw = fp_read(chunk * size)
+        if len(raw) < chunk * size:
+            raise DecoderException('Container typed array too short')
+        container.extend(unpack('>%d%s' % (chunk, fmt), raw))
+        count -= chunk
+    return container
 
 
 def __decode_array(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys):
@@ -276,33 +371,50 @@ def __decode_array(fp_read, no_bytes, object_hook, object_pairs_hook, intern_obj
             raise DecoderException('Container bytes array too short')
         return container
 
-    container = []
-    while count > 0 and (counting or marker != ARRAY_END):
-        if marker == TYPE_NOOP:
-            marker = fp_read(1)
-            continue
+    # special case - fixed-length numeric type: unpack all values in bulk rather than one at a time
+    if type_ in __TYPED_ARRAY_FORMATS:
+        return __decode_typed_array(fp_read, type_, count)
 
-        # decode value
-        try:
-            value = __METHOD_MAP[marker](fp_read, marker)
-        except KeyError:
-            handled = False
-        else:
-            handled = True
-
-        # handle outside above except (on KeyError) so do not have unfriendly "exception within except" backtrace
-        if not handled:
-            if marker == ARRAY_START:
-                value = __decode_array(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys)
-            elif marker == OBJECT_START:
-                value = __decode_object(fp_read, no_bytes, object_hook, object_pairs_hook, intern_object_keys)
+    container = []
+    method_map_get = __METHOD_MAP.get
+
+    # Counted & uncounted containers are handled in separate loops (see __decode_object)
+    if counting:
+        # loop-invariant
+        untyped = type_ == TYPE_NONE
+        while count > 0:
+            if marker == TYPE_NOOP:
+                marker = fp_read(1)
+                continue
+
+            # decode value
+            decoder = method_map_get(marker)
+            if decoder is not None:
+                value = decoder(fp_read, marker)
             else:
-                raise DecoderException('Invalid marker within array')
+                value = __decode_container(fp_read, marker, no_bytes, object_hook, object_pairs_hook,
+                                           intern_object_keys, 'array')
 
-        container.append(value)
-        if counting:
+            container.append(value)
             count -= 1
-        if count and type_ == TYPE_NONE:
+            if count and untyped:
+                marker = fp_read(1)
+
+    else:
+        while marker != ARRAY_END:
+            if marker == TYPE_NOOP:
+                marker = fp_read(1)
+                continue
+
+            # decode value
+            decoder = method_map_get(marker)
+            if decoder is not None:
+                value = decoder(fp_read, marker)
+            else:
+                value = __decode_container(fp_read, marker, no_bytes, object_hook, object_pairs_hook,
+                                           intern_object_keys, 'array')
+
+            container.append(value)
             marker = fp_read(1)
 
     return container
@@ -374,20 +486,23 @@ def load(fp, no_bytes=False, object_hook=None, object_pairs_hook=None, intern_ob
     if not callable(fp.read):
         raise TypeError('fp.read not callable')
     fp_read = fp.read
+    fp_tell = fp.tell if hasattr(fp, 'tell') else None
 
     marker = fp_read(1)
     try:
-        try:
-            return __METHOD_MAP[marker](fp_read, marker)
-        except KeyError:
-            pass
+        decoder = __METHOD_MAP.get(marker)
+        if decoder is not None:
+            return decoder(fp_read, marker)
         if marker == ARRAY_START:
             return __decode_array(fp_read, bool(no_bytes), object_hook, object_pairs_hook, intern_object_keys)
         if marker == OBJECT_START:
             return __decode_object(fp_read, bool(no_bytes), object_hook, object_pairs_hook, intern_object_keys)
         raise DecoderException('Invalid marker')
     except DecoderException as ex:
-        raise_from(DecoderException(ex.args[0], position=(fp.tell() if hasattr(fp, 'tell') else None)), ex)
+        # already has position (e.g. raised by nested load() call within hook)
+        if ex.position is not None:
+            raise
+        raise_from(DecoderException(ex.args[0], position=(fp_tell() if fp_tell is not None else None)), ex)
 
 
 def loadb(chars, no_bytes=False, object_hook=None, object_pairs_hook=None, intern_object_keys=False):
@@ -19,8 +19,11 @@ from struct import pack, Struct
 from decimal import Decimal
 from io import BytesIO
 from math import isinf, isnan
+from array import array
+from sys import byteorder
 
-from .compat import Mapping, Sequence, INTEGER_TYPES, UNICODE_TYPE, TEXT_TYPES, BYTES_TYPES
+from .compat import (Mapping, Sequence, INTEGER_TYPES, UNICODE_TYPE, TEXT_TYPES, BYTES_TYPES, ARRAY_TYPECODES,
+                     array_tobytes)
 from .markers import (TYPE_NULL, TYPE_BOOL_TRUE, TYPE_BOOL_FALSE, TYPE_INT8, TYPE_UINT8, TYPE_INT16, TYPE_INT32,
                       TYPE_INT64, TYPE_FLOAT32, TYPE_FLOAT64, TYPE_HIGH_PREC, TYPE_CHAR, TYPE_STRING, OBJECT_START,
                       OBJECT_END, ARRAY_START, ARRAY_END, CONTAINER_TYPE, CONTAINER_COUNT)
@@ -28,14 +31,47 @@ from .markers import (TYPE_NULL, TYPE_BOOL_TRUE, TYPE_BOOL_FALSE, TYPE_INT8, TYP
 # Lookup tables for encoding small intergers, pre-initialised larger integer & float packers
 __SMALL_INTS_ENCODED = {i: TYPE_INT8 + pack('>b', i) for i in range(-128, 128)}
 __SMALL_UINTS_ENCODED = {i: TYPE_UINT8 + pack('>B', i) for i in range(256)}
-__PACK_INT16 = Struct('>h').pack
-__PACK_INT32 = Struct('>i').pack
-__PACK_INT64 = Struct('>q').pack
-__PACK_FLOAT32 = Struct('>f').pack
-__PACK_FLOAT64 = Struct('>d').pack
+# Packers include the (single byte) type marker so that each value needs only one write
+__PACK_INT16 = Struct('>ch').pack
+__PACK_INT32 = Struct('>ci').pack
+__PACK_INT64 = Struct('>cq').pack
+__PACK_FLOAT32 = Struct('>cf').pack
+__PACK_FLOAT64 = Struct('>cd').pack
+# Prefixes (type marker & length) for strings whose length fits into a single byte. (Payload is written separately
+# since concatenating it would be more expensive than an additional write.)
+__SMALL_STRING_PREFIXES = [TYPE_STRING + TYPE_UINT8 + pack('>B', i) for i in range(256)]
 
 # Prefix applicable to specialised byte array container
 __BYTES_ARRAY_PREFIX = ARRAY_START + CONTAINER_TYPE + TYPE_UINT8 + CONTAINER_COUNT
+# Container start (including count) for counted containers whose length fits into a single byte
+__SMALL_COUNTED_ARRAY_PREFIXES = [ARRAY_START + CONTAINER_COUNT + TYPE_UINT8 + pack('>B', i) for i in range(256)]
+__SMALL_COUNTED_OBJECT_PREFIXES = [OBJECT_START + CONTAINER_COUNT + TYPE_UINT8 + pack('>B', i) for i in range(256)]
+# Complete encoding of empty containers (without & with container_count option)
+__EMPTY_ARRAY = ARRAY_START + ARRAY_END
+__EMPTY_ARRAY_COUNTED = __SMALL_COUNTED_ARRAY_PREFIXES[0]
+__EMPTY_OBJECT = OBJECT_START + OBJECT_END
+__EMPTY_OBJECT_COUNTED = __SMALL_COUNTED_OBJECT_PREFIXES[0]
+
+# Minimum number of items a sequence must have to be considered for encoding as typed array (typed_arrays option)
+__TYPED_ARRAY_MIN_LENGTH = 4
+# Exact integer types eligible for typed arrays (i.e. excluding bool)
+__TYPED_ARRAY_INT_TYPES = frozenset(INTEGER_TYPES)
+# Typed array integer types (uint8 is excluded since such arrays decode as bytes) in order of preference: type
+# marker, struct format, minimum & maximum value
+__TYPED_ARRAY_INT_RANGES = ((TYPE_INT8, 'b', -(2 ** 7), 2 ** 7 - 1),
+                            (TYPE_INT16, 'h', -(2 ** 15), 2 ** 15 - 1),
+                            (TYPE_INT32, 'i', -(2 ** 31), 2 ** 31 - 1),
+                            (TYPE_INT64, 'q', -(2 ** 63), 2 ** 63 - 1))
+__INF = float('inf')
+# Typed array type markers for (signed integer & float) array.array typecodes
+__TYPED_ARRAY_INT_MARKERS_BY_SIZE = {1: TYPE_INT8, 2: TYPE_INT16, 4: TYPE_INT32, 8: TYPE_INT64}
+__ARRAY_TYPECODE_MARKERS = {typecode: __TYPED_ARRAY_INT_MARKERS_BY_SIZE[array(typecode).itemsize]
+                            for typecode in 'bhilq' if typecode in ARRAY_TYPECODES}
+__ARRAY_TYPECODE_MARKERS.update(f=TYPE_FLOAT32, d=TYPE_FLOAT64)
+__ARRAY_NEEDS_BYTESWAP = byteorder == 'little'
+# Prefixes (excluding count) for typed arrays by type marker
+__TYPED_ARRAY_PREFIXES = {type_: ARRAY_START + CONTAINER_TYPE + type_ + CONTAINER_COUNT
+                          for type_ in (TYPE_INT8, TYPE_INT16, TYPE_INT32, TYPE_INT64, TYPE_FLOAT32, TYPE_FLOAT64)}
 
 
 class EncoderException(TypeError):
@@ -44,9 +80,13 @@ class EncoderException(TypeError):
 
 def __encode_decimal(fp_write, item):
     if item.is_finite():
-        fp_write(TYPE_HIGH_PREC)
         encoded_val = str(item).encode('utf-8')
-        __encode_int(fp_write, len(encoded_val))
+        length = len(encoded_val)
+        if length < 2 ** 8:
+            fp_write(TYPE_HIGH_PREC + __SMALL_UINTS_ENCODED[length])
+        else:
+            fp_write(TYPE_HIGH_PREC)
+            __encode_int(fp_write, length)
         fp_write(encoded_val)
     else:
         fp_write(TYPE_NULL)
@@ -57,38 +97,30 @@ def __encode_int(fp_write, item):
         if item < 2 ** 8:
             fp_write(__SMALL_UINTS_ENCODED[item])
         elif item < 2 ** 15:
-            fp_write(TYPE_INT16)
-            fp_write(__PACK_INT16(item))
+            fp_write(__PACK_INT16(TYPE_INT16, item))
         elif item < 2 ** 31:
-            fp_write(TYPE_INT32)
-            fp_write(__PACK_INT32(item))
+            fp_write(__PACK_INT32(TYPE_INT32, item))
         elif item < 2 ** 63:
-            fp_write(TYPE_INT64)
-            fp_write(__PACK_INT64(item))
+            fp_write(__PACK_INT64(TYPE_INT64, item))
         else:
             __encode_decimal(fp_write, Decimal(item))
     elif item >= -(2 ** 7):
         fp_write(__SMALL_INTS_ENCODED[item])
     elif item >= -(2 ** 15):
-        fp_write(TYPE_INT16)
-        fp_write(__PACK_INT16(item))
+        fp_write(__PACK_INT16(TYPE_INT16, item))
     elif item >= -(2 ** 31):
-        fp_write(TYPE_INT32)
-        fp_write(__PACK_INT32(item))
+        fp_write(__PACK_INT32(TYPE_INT32, item))
     elif item >= -(2 ** 63):
-        fp_write(TYPE_INT64)
-        fp_write(__PACK_INT64(item))
+        fp_write(__PACK_INT64(TYPE_INT64, item))
     else:
         __encode_decimal(fp_write, Decimal(item))
 
 
 def __encode_float(fp_write, item):
     if 1.18e-38 <= abs(item) <= 3.4e38 or item == 0:
-        fp_write(TYPE_FLOAT32)
-        fp_write(__PACK_FLOAT32(item))
+        fp_write(__PACK_FLOAT32(TYPE_FLOAT32, item))
     elif 2.23e-308 <= abs(item) < 1.8e308:
-        fp_write(TYPE_FLOAT64)
-        fp_write(__PACK_FLOAT64(item))
+        fp_write(__PACK_FLOAT64(TYPE_FLOAT64, item))
     elif isinf(item) or isnan(item):
         fp_write(TYPE_NULL)
     else:
@@ -97,11 +129,9 @@ def __encode_float(fp_write, item):
 
 def __encode_float64(fp_write, item):
     if 2.23e-308 <= abs(item) < 1.8e308:
-        fp_write(TYPE_FLOAT64)
-        fp_write(__PACK_FLOAT64(item))
+        fp_write(__PACK_FLOAT64(TYPE_FLOAT64, item))
     elif item == 0:
-        fp_write(TYPE_FLOAT32)
-        fp_write(__PACK_FLOAT32(item))
+        fp_write(__PACK_FLOAT32(TYPE_FLOAT32, item))
     elif isinf(item) or isnan(item):
         fp_write(TYPE_NULL)
     else:
@@ -113,38 +143,134 @@ def __encode_string(fp_write, item):
     length = len(encoded_val)
     if length == 1:
         fp_write(TYPE_CHAR)
+    elif length < 2 ** 8:
+        fp_write(__SMALL_STRING_PREFIXES[length])
     else:
         fp_write(TYPE_STRING)
-        if length < 2 ** 8:
-            fp_write(__SMALL_UINTS_ENCODED[length])
-        else:
-            __encode_int(fp_write, length)
+        __encode_int(fp_write, length)
     fp_write(encoded_val)
 
 
 def __encode_bytes(fp_write, item):
-    fp_write(__BYTES_ARRAY_PREFIX)
     length = len(item)
     if length < 2 ** 8:
-        fp_write(__SMALL_UINTS_ENCODED[length])
+        fp_write(__BYTES_ARRAY_PREFIX + __SMALL_UINTS_ENCODED[length])
     else:
+        fp_write(__BYTES_ARRAY_PREFIX)
         __encode_int(fp_write, length)
     fp_write(item)
     # no ARRAY_END since length was specified
 
 
-def __encode_value(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default):
-    if isinstance(item, UNICODE_TYPE):
+def __encode_none(fp_write, item):  # pylint: disable=unused-argument
+    fp_write(TYPE_NULL)
+
+
+def __encode_bool(fp_write, item):
+    fp_write(TYPE_BOOL_TRUE if item else TYPE_BOOL_FALSE)
+
+
+# Encoders of scalar types, keyed by exact type. Subclasses are handled by isinstance() checks in __encode_value.
+__EXACT_ENCODERS = {type(None): __encode_none,
+                    bool: __encode_bool,
+                    float: __encode_float,
+                    Decimal: __encode_decimal}
+__EXACT_ENCODERS.update((type_, __encode_int) for type_ in INTEGER_TYPES)
+__EXACT_ENCODERS.update((type_, __encode_bytes) for type_ in BYTES_TYPES)
+# As above but for no_float32 option
+__EXACT_ENCODERS_NO_FLOAT32 = dict(__EXACT_ENCODERS)
+__EXACT_ENCODERS_NO_FLOAT32[float] = __encode_float64
+
+
+def __encode_typed_array_start(fp_write, type_, length):
+    if length < 2 ** 8:
+        fp_write(__TYPED_ARRAY_PREFIXES[type_] + __SMALL_UINTS_ENCODED[length])
+    else:
+        fp_write(__TYPED_ARRAY_PREFIXES[type_])
+        __encode_int(fp_write, length)
+
+
+def __encode_array_array(fp_write, item, length, no_float32):
+    """Encodes array.array item as typed array (of the type matching its typecode) without converting individual values.
+    Returns whether it did so."""
+    type_ = __ARRAY_TYPECODE_MARKERS.get(item.typecode)
+    if type_ is None:
+        return False
+
+    if type_ in (TYPE_FLOAT32, TYPE_FLOAT64):
+        # comparison also excludes NaN
+        if not all(-__INF < value < __INF for value in item):
+            return False
+        if no_float32 and type_ == TYPE_FLOAT32:
+            type_ = TYPE_FLOAT64
+            item = array('d', item)
+
+    if __ARRAY_NEEDS_BYTESWAP:
+        item = item[:]
+        item.byteswap()
+
+    __encode_typed_array_start(fp_write, type_, length)
+    fp_write(array_tobytes(item))
+    return True
+
+
+def __encode_typed_array(fp_write, item, no_float32):
+    """Encodes item as typed array if it consists solely of integers or finite floats. Returns whether it did so."""
+    length = len(item)
+    if length < __TYPED_ARRAY_MIN_LENGTH:
+        return False
+
+    if isinstance(item, array) and __encode_array_array(fp_write, item, length, no_float32):
+        return True
+
+    if all(type(value) in __TYPED_ARRAY_INT_TYPES for value in item):
+        lowest = min(item)
+        highest = max(item)
+        for type_, fmt, min_value, max_value in __TYPED_ARRAY_INT_RANGES:
+            if min_value <= lowest and highest <= max_value:
+                break
+        else:
+            # out of int64 range
+            return False
+
+    # comparison also excludes NaN
+    elif all(type(value) is float and -__INF < value < __INF  # pylint: disable=unidiomatic-typecheck
+             for value in item):
+        if not no_float32 and all(1.18e-38 <= abs(value) <= 3.4e38 or value == 0 for value in item):
+            type_, fmt = TYPE_FLOAT32, 'f'
+        else:
+            type_, fmt = TYPE_FLOAT64, 'd'
+
+    else:
+        return False
+
+    __encode_typed_array_start(fp_write, type_, length)
+    fp_write(pack('>%d%s' % (length, fmt), *item))
+    # no ARRAY_END since length was specified
+    return True
+
+
+def __encode_value(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays):
+    item_type = type(item)
+    # most common type, cheaper to check directly than via lookup below
+    if item_type is UNICODE_TYPE:
         __encode_string(fp_write, item)
+        return
 
-    elif item is None:
-        fp_write(TYPE_NULL)
+    encoder = (__EXACT_ENCODERS_NO_FLOAT32 if no_float32 else __EXACT_ENCODERS).get(item_type)
+    if encoder is not None:
+        encoder(fp_write, item)
 
-    elif item is True:
-        fp_write(TYPE_BOOL_TRUE)
+    # exact built-in container types avoid (slower) abstract base class checks below
+    elif item_type is dict:
+        __encode_object(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays)
 
-    elif item is False:
-        fp_write(TYPE_BOOL_FALSE)
+    elif item_type is list or item_type is tuple:
+        __encode_array(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays)
+
+    # subclasses of the above types & other mappings/sequences
+    elif isinstance(item, UNICODE_TYPE):
+        __encode_string(fp_write, item)
 
     elif isinstance(item, INTEGER_TYPES):
         __encode_int(fp_write, item)
@@ -163,54 +289,100 @@ def __encode_value(fp_write, item, seen_containers, container_count, sort_keys,
 
     # order important since mappings could also be sequences
     elif isinstance(item, Mapping):
-        __encode_object(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default)
+        __encode_object(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays)
 
     elif isinstance(item, Sequence):
-        __encode_array(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default)
+        __encode_array(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays)
 
     elif default is not None:
-        __encode_value(fp_write, default(item), seen_containers, container_count, sort_keys, no_float32, default)
+        __encode_value(fp_write, default(item), seen_containers, container_count, sort_keys, no_float32, default,
+                       typed_arrays)
 
     else:
         raise EncoderException('Cannot encode item of type %s' % type(item))
 
 
-def __encode_array(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default):
-    # circular reference check
-    container_id = id(item)
-    if container_id in seen_containers:
-        raise ValueError('Circular reference detected')
-    seen_containers[container_id] = item
+# separate loops for sequences with & without a same-type fast path (see below) add branches but avoid per-item checks
+def __encode_array(fp_write, item, seen_containers, container_count, sort_keys,  # pylint: disable=too-many-branches
+                   no_float32, default, typed_arrays):
+    # (empty & typed arrays cannot contain circular references)
+    if not item:
+        fp_write(__EMPTY_ARRAY_COUNTED if container_count else __EMPTY_ARRAY)
+        return
+    if typed_arrays and __encode_typed_array(fp_write, item, no_float32):
+        return
+
+    # circular reference check (seen_containers is None if disabled)
+    if seen_containers is not None:
+        container_id = id(item)
+        if container_id in seen_containers:
+            raise ValueError('Circular reference detected')
+        seen_containers[container_id] = item
 
-    fp_write(ARRAY_START)
     if container_count:
-        fp_write(CONTAINER_COUNT)
-        __encode_int(fp_write, len(item))
+        length = len(item)
+        if length < 2 ** 8:
+            fp_write(__SMALL_COUNTED_ARRAY_PREFIXES[length])
+        else:
+            fp_write(ARRAY_START + CONTAINER_COUNT)
+            __encode_int(fp_write, length)
+    else:
+        fp_write(ARRAY_START)
+
+    # Sequences are often homogeneous, so scalar items of the same exact type as the first one are encoded directly
+    # (rather than via __encode_value) since the additional function call is noticeably slower.
+    first_type = type(item[0])
+    if first_type is UNICODE_TYPE:
+        encoder = __encode_string
+    else:
+        encoder = (__EXACT_ENCODERS_NO_FLOAT32 if no_float32 else __EXACT_ENCODERS).get(first_type)
 
-    for value in item:
-        __encode_value(fp_write, value, seen_containers, container_count, sort_keys, no_float32, default)
+    if encoder is None:
+        for value in item:
+            __encode_value(fp_write, value, seen_containers, container_count, sort_keys, no_float32, default,
+                           typed_arrays)
+    else:
+        for value in item:
+            if type(value) is first_type:  # pylint: disable=unidiomatic-typecheck
+                encoder(fp_write, value)
+            else:
+                __encode_value(fp_write, value, seen_containers, container_count, sort_keys, no_float32, default,
+                               typed_arrays)
 
     if not container_count:
         fp_write(ARRAY_END)
 
-    del seen_containers[container_id]
+    if seen_containers is not None:
+        del seen_containers[container_id]
+
 
+def __encode_object(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays):
+    # (empty objects cannot contain circular references)
+    if not item:
+        fp_write(__EMPTY_OBJECT_COUNTED if container_count else __EMPTY_OBJECT)
+        return
 
-def __encode_object(fp_write, item, seen_containers, container_count, sort_keys, no_float32, default):
-    # circular reference check
-    container_id = id(item)
-    if container_id in seen_containers:
-        raise ValueError('Circular reference detected')
-    seen_containers[container_id] = item
+    # circular reference check (seen_containers is None if disabled)
+    if seen_containers is not None:
+        container_id = id(item)
+        if container_id in seen_containers:
+            raise ValueError('Circular reference detected')
+        seen_containers[container_id] = item
 
-    fp_write(OBJECT_START)
     if container_count:
-        fp_write(CONTAINER_COUNT)
-        __encode_int(fp_write, len(item))
+        length = len(item)
+        if length < 2 ** 8:
+            fp_write(__SMALL_COUNTED_OBJECT_PREFIXES[length])
+        else:
+            fp_write(OBJECT_START + CONTAINER_COUNT)
+            __encode_int(fp_write, length)
+    else:
+        fp_write(OBJECT_START)
 
-    for key, value in sorted(item.items()) if sort_keys else item.items():
-        # allow both str & unicode for Python 2
-        if not isinstance(key, TEXT_TYPES):
+    # sorting keys only (rather than key-value tuples) is cheaper
+    for key, value in ((key, item[key]) for key in sorted(item)) if sort_keys else item.items():
+        # allow both str & unicode for Python 2 (exact type check first since cheaper)
+        if type(key) is not UNICODE_TYPE and not isinstance(key, TEXT_TYPES):  # pylint: disable=unidiomatic-typecheck
             raise EncoderException('Mapping keys can only be strings')
         encoded_key = key.encode('utf-8')
         length = len(encoded_key)
@@ -220,15 +392,17 @@ def __encode_object(fp_write, item, seen_containers, container_count, sort_keys,
             __encode_int(fp_write, length)
         fp_write(encoded_key)
 
-        __encode_value(fp_write, value, seen_containers, container_count, sort_keys, no_float32, default)
+        __encode_value(fp_write, value, seen_containers, container_count, sort_keys, no_float32, default, typed_arrays)
 
     if not container_count:
         fp_write(OBJECT_END)
 
-    del seen_containers[container_id]
+    if seen_containers is not None:
+        del seen_containers[container_id]
 
 
-def dump(obj, fp, container_count=False, sort_keys=False, no_float32=True, default=None):
+def dump(obj, fp, container_count=False, sort_keys=False, no_float32=True, default=None, typed_arrays=False,
+         check_circular=True):
     """Writes the given object as UBJSON to the provided file-like object
 
     Args:
@@ -247,6 +421,22 @@ def dump(obj, fp, container_count=False, sort_keys=False, no_float32=True, defau
         default (callable): Called for objects which cannot be serialised.
                             Should return a UBJSON-encodable version of the
                             object or raise an EncoderException.
+        typed_arrays (bool): Encode sequences (of at least four items) which
+                             consist only of integers or only of (finite)
+                             floats as typed arrays. This removes the need for
+                             a type marker per item and allows for faster
+                             decoding. Note that the smallest integer type
+                             which can hold all of the values is used for all
+                             of them, so the output can be larger than without
+                             this option if the magnitude of values varies
+                             greatly. Instances of array.array with a signed
+                             integer or float typecode are encoded using the
+                             type matching their typecode instead.
+        check_circular (bool): Check containers for circular references (and
+                               raise ValueError if one is found). Disabling
+                               this speeds up encoding of containers but a
+                               circular reference will then instead lead to a
+                               RecursionError (or RuntimeError in Python 2).
 
     Raises:
         EncoderException: If an encoding failure occured.
@@ -295,17 +485,24 @@ def dump(obj, fp, container_count=False, sort_keys=False, no_float32=True, defau
         float32: 1.18e-38 <= abs(value) <= 3.4e38 or value == 0
         float64: 2.23e-308 <= abs(value) < 1.8e308
         For other values Decimal is used.
+    - typed arrays (typed_arrays setting) use int8, int16, int32 or int64
+      (never uint8, since such arrays are decoded as bytes) for integers and
+      float32 (only if all values meet the above float32 criteria) or float64
+      for floats.
     """
     if not callable(fp.write):
         raise TypeError('fp.write not callable')
     fp_write = fp.write
 
-    __encode_value(fp_write, obj, {}, container_count, sort_keys, no_float32, default)
+    __encode_value(fp_write, obj, {} if check_circular else None, container_count, sort_keys, no_float32, default,
+                   typed_arrays)
 
 
-def dumpb(obj, container_count=False, sort_keys=False, no_float32=True, default=None):
+def dumpb(obj, container_count=False, sort_keys=False, no_float32=True, default=None, typed_arrays=False,
+          check_circular=True):
     """Returns the given object as UBJSON in a bytes instance. See dump() for
        available arguments."""
     with BytesIO() as fp:
-        dump(obj, fp, container_count=container_count, sort_keys=sort_keys, no_float32=no_float32, default=default)
+        dump(obj, fp, container_count=container_count, sort_keys=sort_keys, no_float32=no_float32, default=default,
+             typed_arrays=typed_arrays, check_circular=check_circular)
         return fp.getvalue()